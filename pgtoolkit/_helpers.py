@@ -1,49 +1,74 @@
 from __future__ import annotations
 
+import io
 import json
+import os
 import sys
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import IO, Any, Generic, NoReturn, TypeVar, overload
 
+T = TypeVar("T")
+
 
 def format_timedelta(delta: timedelta) -> str:
-    values = [
-        f"{v}{u}"
-        for v, u in (
-            (delta.days, "d"),
-            (delta.seconds, "s"),
-            (delta.microseconds, "us"),
-        )
-        if v
-    ]
+    values = []
+    if delta.days:
+        values.append(f"{delta.days}d")
+    if delta.seconds:
+        values.append(f"{delta.seconds}s")
+    if delta.microseconds:
+        values.append(f"{delta.microseconds}us")
     if values:
         return " ".join(values)
     else:
         return "0s"
 
 
+def jsonable(obj: timedelta | datetime | T) -> str | T:
+    # Convert dates and durations to strings, for values to be converted
+    # beforehand instead of through JSONEncoder.default(). JSONDateEncoder
+    # delegates to this function.
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    elif isinstance(obj, timedelta):
+        return format_timedelta(obj)
+    return obj
+
+
 class JSONDateEncoder(json.JSONEncoder):
     def default(self, obj: timedelta | datetime | object) -> Any:
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        elif isinstance(obj, timedelta):
-            return format_timedelta(obj)
-        return super().default(obj)
+        value = jsonable(obj)
+        if value is obj:
+            return super().default(obj)
+        return value
+
+
+def _buffering(path: str | Path, mode: str = "r") -> int:
+    # Size the read buffer after the file, within [DEFAULT_BUFFER_SIZE, 1MiB],
+    # so that large files are read with fewer system calls. Errors are left
+    # to open().
+    if mode != "r":
+        return -1
+    try:
+        size = os.stat(path).st_size
+    except OSError:
+        return -1
+    return max(io.DEFAULT_BUFFER_SIZE, min(size, 1 << 20))
 
 
 def open_or_stdin(filename: str, stdin: IO[str] = sys.stdin) -> IO[str]:
     if filename == "-":
         fo = stdin
     else:
-        fo = open(filename)
+        fo = open(filename, buffering=_buffering(filename))
     return fo
 
 
-T = TypeVar("T")
-
-
 class PassthroughManager(Generic[T]):
+    __slots__ = ("ret",)
+
     def __init__(self, ret: T) -> None:
         self.ret = ret
 
@@ -78,14 +103,15 @@ def open_or_return(
     # Returns a context manager around a file-object for fo_or_path. If
     # fo_or_path is a file-object, the context manager keeps it open. If it's a
     # path, the file is opened with mode and will be closed upon context exit.
-    # If fo_or_path is None, a ValueError is raised.
+    # If fo_or_path is None, a ValueError is raised. Files opened for reading
+    # get a buffer sized after the file (up to 1MiB).
 
     if fo_or_path is None:
         raise ValueError("No file-like object nor path provided")
     if isinstance(fo_or_path, str):
-        return open(fo_or_path, mode)
+        return open(fo_or_path, mode, buffering=_buffering(fo_or_path, mode))
     if isinstance(fo_or_path, Path):
-        return fo_or_path.open(mode)
+        return fo_or_path.open(mode, buffering=_buffering(fo_or_path, mode))
 
     # Skip default file context manager. This allows to always use with
     # statement and don't care about closing the file. If the file is opened
@@ -95,9 +121,12 @@ def open_or_return(
 
 
 class Timer:
+    __slots__ = ("start", "delta")
+
     def __enter__(self) -> Timer:
-        self.start = datetime.now(timezone.utc)
+        self.start = time.perf_counter_ns()
         return self
 
     def __exit__(self, *a: Any) -> None:
-        self.delta = datetime.now(timezone.utc) - self.start
+        elapsed = time.perf_counter_ns() - self.start
+        self.delta = timedelta(microseconds=elapsed // 1000)
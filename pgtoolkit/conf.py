@@ -41,21 +41,24 @@ You can use this module to dump a configuration file as JSON object
 
 from __future__ import annotations
 
+import bisect
 import contextlib
-import copy
 import enum
+import functools
+import io
 import json
+import os
 import pathlib
 import re
+import string
 import sys
-from collections import OrderedDict
 from collections.abc import Iterable, Iterator
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import timedelta
 from typing import IO, Any, ClassVar, NoReturn, Union
 from warnings import warn
 
-from ._helpers import JSONDateEncoder, open_or_return
+from ._helpers import JSONDateEncoder, jsonable, open_or_return
 
 
 class ParseError(Exception):
@@ -73,6 +76,9 @@ class IncludeType(enum.Enum):
     include = enum.auto()
 
 
+_include_types: dict[str, IncludeType] = dict(IncludeType.__members__)
+
+
 def parse(fo: str | pathlib.Path | IO[str]) -> Configuration:
     """Parse a configuration file.
 
@@ -102,8 +108,9 @@ def parse(fo: str | pathlib.Path | IO[str]) -> Configuration:
 
 
 def _consume(conf: Configuration, content: Iterable[str]) -> Iterator[None]:
+    basedirs: dict[str, pathlib.Path] = {}
     for include_path, include_type in conf.parse(content):
-        yield from parse_include(conf, include_path, include_type)
+        yield from parse_include(conf, include_path, include_type, _basedirs=basedirs)
 
 
 def parse_string(string: str, source: str | None = None) -> Configuration:
@@ -125,13 +132,18 @@ def parse_include(
     path: pathlib.Path,
     include_type: IncludeType,
     *,
-    _processed: set[pathlib.Path] | None = None,
+    _processed: set[str] | None = None,
+    _basedirs: dict[str, pathlib.Path] | None = None,
 ) -> Iterator[None]:
     """Parse on include directive with 'path' value of type 'include_type' into
     'conf' object.
     """
     if _processed is None:
         _processed = set()
+    if _basedirs is None:
+        # Directories relative include paths are resolved from, by path of
+        # the including configuration.
+        _basedirs = {}
 
     def notfound(
         path: pathlib.Path, include_type: str, reference_path: str | None
@@ -148,46 +160,68 @@ def parse_include(
             raise ParseError(
                 "cannot process include directives referencing a relative path"
             )
-        relative_to = pathlib.Path(conf.path).absolute()
-        assert relative_to.is_absolute()
-        if relative_to.is_file():
-            relative_to = relative_to.parent
+        try:
+            relative_to = _basedirs[conf.path]
+        except KeyError:
+            relative_to = pathlib.Path(conf.path).absolute()
+            assert relative_to.is_absolute()
+            if relative_to.is_file():
+                relative_to = relative_to.parent
+            _basedirs[conf.path] = relative_to
         path = relative_to / path
 
     if include_type == IncludeType.include_dir:
-        if not path.exists() or not path.is_dir():
+        if not path.is_dir():
             raise notfound(path, "directory", conf.path)
-        for confpath in sorted(path.glob("*.conf")):
-            if not confpath.name.startswith("."):
-                yield from parse_include(
-                    conf,
-                    confpath,
-                    IncludeType.include,
-                    _processed=_processed,
-                )
+        with os.scandir(path) as it:
+            names = sorted(
+                e.name
+                for e in it
+                if e.name.endswith(".conf") and not e.name.startswith(".")
+                # Like PostgreSQL, skip directories but not missing files.
+                and not e.is_dir()
+            )
+        for name in names:
+            yield from parse_include(
+                conf,
+                path / name,
+                IncludeType.include,
+                _processed=_processed,
+                _basedirs=_basedirs,
+            )
 
     elif include_type == IncludeType.include_if_exists:
         if path.exists():
             yield from parse_include(
-                conf, path, IncludeType.include, _processed=_processed
+                conf,
+                path,
+                IncludeType.include,
+                _processed=_processed,
+                _basedirs=_basedirs,
             )
 
     elif include_type == IncludeType.include:
-        if not path.exists():
-            raise notfound(path, "file", conf.path)
-
-        if path in _processed:
+        # Normalized string paths make for cheap hashing and also catch loops
+        # through paths with '..' components.
+        key = os.path.normpath(path)
+        if key in _processed:
             raise RuntimeError(f"loop detected in include directive about '{path}'")
-        _processed.add(path)
+        # Opening the file directly saves a stat() call to check existence.
+        try:
+            f = path.open()
+        except FileNotFoundError:
+            raise notfound(path, "file", conf.path) from None
+        _processed.add(key)
 
         subconf = Configuration(path=str(path))
-        with path.open() as f:
+        with f:
             for sub_include_path, sub_include_type in subconf.parse(f):
                 yield from parse_include(
                     subconf,
                     sub_include_path,
                     sub_include_type,
                     _processed=_processed,
+                    _basedirs=_basedirs,
                 )
         conf.entries.update(subconf.entries)
 
@@ -201,7 +235,6 @@ MEMORY_MULTIPLIERS = {
     "GB": 1024 * 1024 * 1024,
     "TB": 1024 * 1024 * 1024 * 1024,
 }
-_memory_re = re.compile(r"^\s*(?P<number>\d+)\s*(?P<unit>[kMGT]B)\s*$")
 TIMEDELTA_ARGNAME = {
     "ms": "milliseconds",
     "s": "seconds",
@@ -209,7 +242,31 @@ TIMEDELTA_ARGNAME = {
     "h": "hours",
     "d": "days",
 }
-_timedelta_re = re.compile(r"^\s*(?P<number>\d+)\s*(?P<unit>ms|s|min|h|d)\s*$")
+# Classify octal numbers (kept as strings), booleans, memory and time values
+# at once; the name of the last matched group tells which kind of value it is.
+_value_re = re.compile(
+    r"(?P<octal>0(?:(?:_?[0-7])+|[oO](?:_?[0-7])+|(?=\s))\s*)"
+    r"|(?P<true>(?i:true|yes|on))"
+    r"|(?P<false>(?i:false|no|off))"
+    r"|\s*(?P<number>\d+)\s*(?:(?P<memory>[kMGT]B)|(?P<timedelta>ms|s|min|h|d))\s*",
+    re.ASCII,
+)
+_match_value = _value_re.fullmatch
+# Characters _value_re matches may start with.
+_value_start = frozenset(string.digits + string.whitespace + "tTyYoOfFnN")
+_booleans = {
+    "true": True,
+    "yes": True,
+    "on": True,
+    "false": False,
+    "no": False,
+    "off": False,
+}
+# Characters int() or float() values may start with, including 'inf',
+# 'infinity' and 'nan' special values (in any case).
+_numeric_start = frozenset("0123456789+-.iInN")
+# Characters allowed in parameter names, as in Configuration._parameter_re.
+_name_chars = "abcdefghijklmnopqrstuvwxyz_."
 
 _minute = 60
 _hour = 60 * _minute
@@ -227,6 +284,9 @@ _timedelta_unit_map = [
 Value = Union[str, bool, float, int, timedelta]
 
 
+# Parsed values are immutable, so results for frequent raw values (e.g. 'on'
+# or '5432') can be shared.
+@functools.lru_cache(maxsize=512)
 def parse_value(raw: str) -> Value:
     # Ref.
     # https://www.postgresql.org/docs/current/static/config-setting.html#CONFIG-SETTING-NAMES-VALUES
@@ -235,42 +295,56 @@ def parse_value(raw: str) -> Value:
     if raw.startswith("'"):
         if not raw.endswith("'"):
             raise ValueError(raw)
-        # unquote value and unescape quotes
-        raw = raw[1:-1].replace("''", "'").replace(r"\'", "'")
+        # unquote value and unescape quotes, if any
+        raw = raw[1:-1]
+        if "'" in raw:
+            raw = raw.replace("''", "'").replace(r"\'", "'")
         quoted = True
 
-    if raw.startswith("0") and raw != "0":
-        try:
-            int(raw, base=8)
-            return raw
-        except ValueError:
-            pass
+    # Fast path for the most common case of a decimal integer; values with a
+    # leading zero might be octal numbers and go through the regex below.
+    if not quoted:
+        digits = raw[1:] if raw.startswith("-") else raw
+        if (
+            digits.isascii()
+            and digits.isdigit()
+            and (not digits.startswith("0") or digits == "0")
+        ):
+            return int(raw)
 
-    m = _memory_re.match(raw)
-    if m:
-        return raw.strip()
+    # Booleans spelled in lower case; others are matched by the regex below.
+    boolean = _booleans.get(raw)
+    if boolean is not None:
+        return boolean
 
-    m = _timedelta_re.match(raw)
+    # Only run the regex on values which may match it, judging by their first
+    # character.
+    m = _match_value(raw) if raw[:1] in _value_start else None
     if m:
-        unit = m.group("unit")
-        arg = TIMEDELTA_ARGNAME[unit]
-        kwargs = {arg: int(m.group("number"))}
-        return timedelta(**kwargs)
-
-    if raw.lower() in ("true", "yes", "on"):
-        return True
-
-    if raw.lower() in ("false", "no", "off"):
-        return False
+        kind = m.lastgroup
+        if kind == "octal":
+            return raw
+        elif kind == "true":
+            return True
+        elif kind == "false":
+            return False
+        elif kind == "memory":
+            return raw.strip()
+        else:
+            assert kind == "timedelta", kind
+            unit = TIMEDELTA_ARGNAME[m.group("timedelta")]
+            return timedelta(**{unit: int(m.group("number"))})
 
-    if not quoted:
+    # Only attempt numeric conversions on values looking like a number, to
+    # avoid raising (and catching) exceptions for most string values.
+    if not quoted and raw.lstrip()[:1] in _numeric_start:
         try:
             return int(raw)
         except ValueError:
             try:
                 return float(raw)
             except ValueError:
-                return raw
+                pass
 
     return raw
 
@@ -282,22 +356,25 @@ def serialize_value(value: Value) -> str:
     elif isinstance(value, str):
         # Only quote if not already quoted.
         if not (value.startswith("'") and value.endswith("'")):
-            # Only double quotes, if not already done; we assume this is
-            # done everywhere in the string or nowhere.
-            if "''" not in value and r"\'" not in value:
+            # Only double quotes, if any and not already done; we assume this
+            # is done everywhere in the string or nowhere.
+            if "'" in value and "''" not in value and r"\'" not in value:
                 value = value.replace("'", "''")
-            value = "'%s'" % value
+            value = f"'{value}'"
     elif isinstance(value, timedelta):
         seconds = value.days * _day + value.seconds
+        # Use the largest unit dividing the value (see _timedelta_unit_map).
         if value.microseconds:
             unit = " ms"
             value = seconds * 1000 + value.microseconds // 1000
+        elif not seconds % _day:
+            unit, value = "d", seconds // _day
+        elif not seconds % _hour:
+            unit, value = "h", seconds // _hour
+        elif not seconds % _minute:
+            unit, value = " min", seconds // _minute
         else:
-            for unit, mod in _timedelta_unit_map:
-                if seconds % mod:
-                    continue
-                value = seconds // mod
-                break
+            unit, value = "s", seconds
         value = f"'{value}{unit}'"
     else:
         value = str(value)
@@ -306,9 +383,28 @@ def serialize_value(value: Value) -> str:
 
 _unspecified: Any = object()
 
+# Slots are only supported by dataclasses from Python 3.10.
+_slots: dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+# Names of the dataclass fields and private state of Entry (sub)classes,
+# copied by Entry._clone().
+_clone_attributes: dict[type, tuple[str, ...]] = {}
+
+
+class _EntryState:
+    # Private state of Entry, kept out of dataclass fields. __weakref__ is
+    # declared here since slotted dataclasses do not support weak references
+    # before Python 3.11.
+    __slots__ = ("_line", "__weakref__")
 
-@dataclass
-class Entry:
+    # Serialized form of the entry, as returned by __str__(), along with the
+    # fields it was computed from.
+    _line: tuple[tuple[Any, ...], str] | None
+
+
+@dataclass(**_slots)
+class Entry(_EntryState):
     """Configuration entry, parsed from a line in the configuration file."""
 
     name: str
@@ -319,6 +415,7 @@ class Entry:
     raw_line: str = field(default=_unspecified, compare=False, repr=False)
 
     def __post_init__(self) -> None:
+        self._line = None
         if self.raw_line is _unspecified:
             # We parse value only if not already parsed from a file
             if isinstance(self._value, str):
@@ -339,12 +436,35 @@ class Entry:
     def serialize(self) -> str:
         return serialize_value(self.value)
 
+    def _clone(self) -> Entry:
+        # Cheaper than copy.copy(), which goes through the copy protocol.
+        cls = type(self)
+        try:
+            names = _clone_attributes[cls]
+        except KeyError:
+            names = _clone_attributes[cls] = tuple(
+                f.name for f in fields(self)
+            ) + tuple(n for n in _EntryState.__slots__ if n != "__weakref__")
+        new = cls.__new__(cls)
+        for name in names:
+            setattr(new, name, getattr(self, name))
+        # Attributes of subclasses without slots, or of Entry itself before
+        # Python 3.10.
+        if hasattr(self, "__dict__"):
+            new.__dict__.update(self.__dict__)
+        return new
+
     def __str__(self) -> str:
-        line = "%(name)s = %(value)s" % dict(name=self.name, value=self.serialize())
+        # Value is compared by repr() since, e.g., 1 == True and 0.0 == -0.0.
+        key = (self.name, repr(self._value), self.commented, self.comment)
+        if self._line is not None and self._line[0] == key:
+            return self._line[1]
+        line = f"{self.name} = {self.serialize()}"
         if self.comment:
             line += "  # " + self.comment
         if self.commented:
             line = "#" + line
+        self._line = key, line
         return line
 
 
@@ -401,8 +521,15 @@ class EntriesProxy(dict[str, Entry]):
         super().__setitem__(name, entry)
 
 
-@dataclass
-class Configuration:
+class _ConfigurationState:
+    # Private state of Configuration, kept out of dataclass fields.
+    __slots__ = ("_lineno", "__weakref__")
+
+    _lineno: dict[str, int]
+
+
+@dataclass(**_slots)
+class Configuration(_ConfigurationState):
     r"""Holds a parsed configuration.
 
     You can access parameter using attribute or dictionary syntax.
@@ -462,20 +589,37 @@ class Configuration:
     # entries serialized. When adding a setting or updating an existing one,
     # the serialized line is updated accordingly. This allows to keep comments
     # and serialize only what's needed. Other lines are just written as-is.
+    # The position of each entry's line is tracked by name in _lineno so that
+    # updating an entry does not need to search through lines.
 
     path: str | None = None
     lines: list[str] = field(default_factory=list, init=False)
-    entries: dict[str, Entry] = field(default_factory=OrderedDict, init=False)
+    entries: dict[str, Entry] = field(default_factory=dict, init=False)
 
     _parameter_re: ClassVar = re.compile(
-        r"^(?P<name>[a-z_.]+)(?: +(?!=)| *= *)(?P<value>.*?)"
+        r"(?P<name>[a-z_.]+)(?: *= *| +(?!=))(?P<value>.*?)"
         "[\\s\t]*"
-        r"(?P<comment>#.*)?$"
+        r"(?P<comment>#.*)?",
+        re.ASCII,
     )
 
+    def __post_init__(self) -> None:
+        # Not self._lineno, which __setattr__() would store as an entry.
+        object.__setattr__(self, "_lineno", {})
+
     def parse(self, fo: Iterable[str]) -> Iterator[tuple[pathlib.Path, IncludeType]]:
-        for raw_line in fo:
-            self.lines.append(raw_line)
+        if isinstance(fo, io.TextIOBase):
+            # Read files at once rather than iterating over them line by line.
+            # Unlike str.splitlines(), this only splits on '\n'.
+            fo = fo.readlines()
+        raw_lines = fo if isinstance(fo, list) else list(fo)
+        # Bind attributes used in the loop to local names.
+        lines, entries, linenos = self.lines, self.entries, self._lineno
+        match = self._parameter_re.fullmatch
+        # Grow lines once with all parsed lines, rather than line by line.
+        start = len(lines)
+        lines.extend(raw_lines)
+        for lineno, raw_line in enumerate(raw_lines, start):
             line = raw_line.strip()
             if not line:
                 continue
@@ -488,39 +632,54 @@ class Configuration:
                 if "=" not in line:
                     continue
                 line = line.lstrip("#").lstrip()
-                m = self._parameter_re.match(line)
-                if not m:
-                    # This is a real comment
-                    continue
                 commented = True
+            name, sep, rest = line.partition("=")
+            if sep:
+                name = name.rstrip(" ")
             else:
-                m = self._parameter_re.match(line)
+                # 'name value' form, without any '=' in the line.
+                name, sep, rest = line.partition(" ")
+            if sep and name and not name.strip(_name_chars):
+                # Common 'name = value  # comment' and 'name value' forms
+                # handled without the regular expression; as with it, the
+                # comment starts at the first '#'.
+                raw_value, sharp, comment = rest.partition("#")
+                raw_value = raw_value.lstrip(" ").rstrip(string.whitespace)
+                comment = sharp + comment if sharp else None
+            else:
+                # Lines with neither '=' nor ' ' or not starting like a
+                # parameter name cannot match.
+                m = match(line) if sep and line[0] in _name_chars else None
                 if not m:
+                    if commented:
+                        # This is a real comment
+                        continue
                     raise ValueError("Bad line: %r." % raw_line)
-            kwargs = m.groupdict()
-            name = kwargs.pop("name")
-            value = parse_value(kwargs.pop("value"))
-            if name in IncludeType.__members__:
+                name, raw_value, comment = m.group("name", "value", "comment")
+            value = parse_value(raw_value)
+            include_type = _include_types.get(name)
+            if include_type is not None:
                 if not commented:
-                    include_type = IncludeType[name]
                     assert isinstance(value, str), type(value)
                     yield (pathlib.Path(value), include_type)
             else:
-                comment = kwargs["comment"]
+                # Interned names make entries lookups with literal keys cheaper.
+                name = sys.intern(name)
                 if comment is not None:
-                    kwargs["comment"] = comment.lstrip("#").lstrip()
+                    comment = comment.lstrip("#").lstrip()
                 if commented:
                     # Only overwrite a previous entry if it is commented.
                     try:
-                        existing_entry = self.entries[name]
+                        existing_entry = entries[name]
                     except KeyError:
                         pass
                     else:
                         if not existing_entry.commented:
                             continue
-                self.entries[name] = Entry(
-                    name, value, commented=commented, raw_line=raw_line, **kwargs
+                entries[name] = Entry(
+                    name, value, commented=commented, comment=comment, raw_line=raw_line
                 )
+                linenos[name] = lineno
 
     def parse_string(self, string: str) -> None:
         list(_consume(self, string.splitlines(keepends=True)))
@@ -539,6 +698,7 @@ class Configuration:
         if not isinstance(other, cls):
             return NotImplemented
         self.lines[:] = []
+        self._lineno.clear()
         self.entries.update(other.entries)
         return self
 
@@ -550,7 +710,8 @@ class Configuration:
 
     def __setattr__(self, name: str, value: Value) -> None:
         if name in self.__dataclass_fields__:
-            super().__setattr__(name, value)
+            # Not super(), which does not work with slotted dataclasses.
+            object.__setattr__(self, name, value)
         else:
             self[name] = value
 
@@ -561,7 +722,7 @@ class Configuration:
         return self.entries[key].value
 
     def __setitem__(self, key: str, value: Value) -> None:
-        if key in IncludeType.__members__:
+        if key in _include_types:
             raise ValueError("cannot add an include directive")
         if key in self.entries:
             e = self.entries[key]
@@ -581,8 +742,24 @@ class Configuration:
         self.entries[entry.name] = entry
         # Append serialized line.
         entry.raw_line = str(entry) + "\n"
+        self._lineno[entry.name] = len(self.lines)
         self.lines.append(entry.raw_line)
 
+    def _find_line(self, key: str, line: str) -> int:
+        """Return the index of 'line', as set for entry 'key', in lines.
+
+        :raises ValueError: if 'line' is not found.
+        """
+        try:
+            lineno = self._lineno[key]
+            if self.lines[lineno] == line:
+                return lineno
+        except (KeyError, IndexError):
+            pass
+        # Lines were modified behind our back or the entry comes from an
+        # included file.
+        return self.lines.index(line)
+
     def _update_entry(self, entry: Entry) -> None:
         key = entry.name
         old_entry, self.entries[key] = self.entries[key], entry
@@ -595,7 +772,7 @@ class Configuration:
         old_line = old_entry.raw_line
         entry.raw_line = str(entry) + "\n"
         try:
-            lineno = self.lines.index(old_line)
+            lineno = self._find_line(key, old_line)
         except ValueError:
             if not entry.commented:
                 msg = (
@@ -604,15 +781,27 @@ class Configuration:
                     " appending a new line to set requested value"
                 )
                 warn(msg, UserWarning)
+                self._lineno[key] = len(self.lines)
                 self.lines.append(entry.raw_line)
         else:
-            self.lines[lineno : lineno + 1] = [entry.raw_line]
+            self.lines[lineno] = entry.raw_line
+            self._lineno[key] = lineno
+
+    def _remove_lines(self, linenos: set[int]) -> None:
+        self.lines[:] = [
+            line for lineno, line in enumerate(self.lines) if lineno not in linenos
+        ]
+        # Shift positions of remaining entries by the number of lines removed
+        # before them.
+        removed = sorted(linenos)
+        for name, lineno in self._lineno.items():
+            self._lineno[name] = lineno - bisect.bisect_left(removed, lineno)
 
     def __iter__(self) -> Iterator[Entry]:
         return iter(self.entries.values())
 
     def as_dict(self) -> dict[str, Value]:
-        return {k: v.value for k, v in self.entries.items() if not v.commented}
+        return {k: v._value for k, v in self.entries.items() if not v.commented}
 
     @contextlib.contextmanager
     def edit(self) -> Iterator[EntriesProxy]:
@@ -651,7 +840,7 @@ class Configuration:
         port = 2345
         unix_socket_directories = '/var/run/postgresql'  # comma-separated list of directories
         """  # noqa: E501
-        entries = EntriesProxy({k: copy.copy(v) for k, v in self.entries.items()})
+        entries = EntriesProxy({k: v._clone() for k, v in self.entries.items()})
         try:
             yield entries
         except Exception:
@@ -664,12 +853,16 @@ class Configuration:
                     self._add_entry(entry)
                 elif self.entries[k] != entry:
                     self._update_entry(entry)
-            # Discard removed entries.
-            for k, entry in list(self.entries.items()):
-                if k not in entries:
-                    del self.entries[k]
-                    if entry.raw_line is not None:
-                        self.lines.remove(entry.raw_line)
+            # Discard removed entries, and their lines all at once.
+            removed = set()
+            for k in self.entries.keys() - entries.keys():
+                entry = self.entries[k]
+                if entry.raw_line is not None:
+                    removed.add(self._find_line(k, entry.raw_line))
+                del self.entries[k]
+                self._lineno.pop(k, None)
+            if removed:
+                self._remove_lines(removed)
 
     def save(self, fo: str | pathlib.Path | IO[str] | None = None) -> None:
         """Write configuration to a file.
@@ -681,14 +874,14 @@ class Configuration:
 
         """
         with open_or_return(fo or self.path, mode="w") as fo:
-            for line in self.lines:
-                fo.write(line)
+            fo.writelines(self.lines)
 
 
 def _main(argv: list[str]) -> int:  # pragma: nocover
     try:
         conf = parse(argv[0] if argv else sys.stdin)
-        print(json.dumps(conf.as_dict(), cls=JSONDateEncoder, indent=2))
+        data = {k: jsonable(v) for k, v in conf.as_dict().items()}
+        print(json.dumps(data, indent=2))
         return 0
     except Exception as e:
         print(str(e), file=sys.stderr)
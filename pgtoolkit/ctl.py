@@ -12,6 +12,7 @@ API Reference
     :members:
 .. autofunction:: run_command
 .. autofunction:: asyncio_run_command
+.. autofunction:: asyncio_run_command_threaded
 .. autoclass:: CommandRunner
     :members: __call__
 .. autoclass:: AsyncCommandRunner
@@ -23,13 +24,15 @@ from __future__ import annotations
 import abc
 import asyncio
 import enum
+import functools
+import os
 import re
 import shutil
 import subprocess
-from collections.abc import Mapping, Sequence
+from collections.abc import Iterable, Mapping, Sequence
 from functools import cached_property
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Literal, Protocol
+from typing import TYPE_CHECKING, Any, Literal, Protocol, TypeVar
 
 if TYPE_CHECKING:
     CompletedProcess = subprocess.CompletedProcess[str]
@@ -100,7 +103,14 @@ async def asyncio_run_command(
     if capture_output:
         kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
     proc = await asyncio.create_subprocess_exec(*args, **kwargs)
-    stdout, stderr = await proc.communicate()
+    stdout: bytes | None
+    stderr: bytes | None
+    if proc.stdin is None and proc.stdout is None and proc.stderr is None:
+        # No pipe to feed or drain, just wait for the process to terminate.
+        await proc.wait()
+        stdout = stderr = None
+    else:
+        stdout, stderr = await proc.communicate()
     assert proc.returncode is not None
     r = CompletedProcess(
         args,
@@ -113,6 +123,25 @@ async def asyncio_run_command(
     return r
 
 
+async def asyncio_run_command_threaded(
+    args: Sequence[str],
+    *,
+    check: bool = False,
+    **kwargs: Any,
+) -> CompletedProcess:
+    """Alternative :class:`AsyncCommandRunner` implementation for
+    :class:`AsyncPGCtl` running :func:`run_command` in the default executor
+    of the event loop.
+
+    This bypasses :mod:`asyncio` subprocess machinery, which may be cheaper
+    when spawning many short-lived commands.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, functools.partial(run_command, args, check=check, **kwargs)
+    )
+
+
 def _args_to_opts(args: Mapping[str, str | Literal[True]]) -> list[str]:
     options = []
     for name, value in sorted(args.items()):
@@ -137,6 +166,56 @@ def _wait_args_to_opts(wait: bool | int) -> list[str]:
     return options
 
 
+# Maximum number of items in the module-level caches below, which live as
+# long as the process does.
+_CACHE_SIZE = 128
+
+_V = TypeVar("_V")
+
+
+def _cache_store(cache: dict[Any, _V], key: Any, value: _V) -> _V:
+    """Store value at key in cache, evicting the oldest items if full."""
+    cache[key] = value
+    while len(cache) > _CACHE_SIZE:
+        del cache[next(iter(cache))]
+    return value
+
+
+# Output of 'pg_config --bindir', by pg_config executable and its
+# modification time (to notice upgrades).
+_bindirs: dict[tuple[str, int], str] = {}
+
+
+def _bindir_key(pg_config: str) -> tuple[str, int]:
+    return pg_config, os.stat(pg_config).st_mtime_ns
+
+
+# Numeric version of pg_ctl executables, by path and modification time (to
+# notice upgrades).
+_versions: dict[tuple[str, int], int] = {}
+
+
+def _version_key(pg_ctl: Path) -> tuple[str, int]:
+    return str(pg_ctl), pg_ctl.stat().st_mtime_ns
+
+
+# Location of pg_config, by value of PATH it was found with.
+_pg_configs: dict[str | None, str] = {}
+
+
+def _pg_config() -> str:
+    path = os.environ.get("PATH")
+    pg_config = _pg_configs.get(path)
+    # Checking that a cached location still exists is cheaper than looking
+    # through all PATH directories again.
+    if pg_config is None or not os.path.exists(pg_config):
+        pg_config = shutil.which("pg_config", path=path)
+        if pg_config is None:
+            raise OSError("pg_config executable not found")
+        _cache_store(_pg_configs, path, pg_config)
+    return pg_config
+
+
 @enum.unique
 class Status(enum.IntEnum):
     """PostgreSQL cluster runtime status."""
@@ -149,6 +228,22 @@ class Status(enum.IntEnum):
     """Unspecified data directory"""
 
 
+_statuses: dict[int, Status] = {s.value: s for s in Status}
+
+
+def _status(cp: CompletedProcess) -> Status:
+    """Return the Status from the result of a 'pg_ctl status' command."""
+    rc = cp.returncode
+    try:
+        return _statuses[rc]
+    except KeyError:
+        if rc == 1:
+            raise subprocess.CalledProcessError(
+                rc, cp.args, cp.stdout, cp.stderr
+            ) from None
+        raise ValueError(f"{rc} is not a valid Status") from None
+
+
 class AbstractPGCtl(abc.ABC):
     bindir: Path
     version: int
@@ -165,10 +260,9 @@ class AbstractPGCtl(abc.ABC):
         return [str(self.pg_ctl), "--version"]
 
     def init_cmd(self, datadir: Path | str, **opts: str | Literal[True]) -> list[str]:
-        cmd = [str(self.pg_ctl), "init"] + ["-D", str(datadir)]
-        options = _args_to_opts(opts)
-        if options:
-            cmd.extend(["-o", " ".join(options)])
+        cmd = [str(self.pg_ctl), "init", "-D", str(datadir)]
+        if opts:
+            cmd.extend(["-o", " ".join(_args_to_opts(opts))])
         return cmd
 
     def start_cmd(
@@ -179,13 +273,12 @@ class AbstractPGCtl(abc.ABC):
         logfile: Path | str | None = None,
         **opts: str | Literal[True],
     ) -> list[str]:
-        cmd = [str(self.pg_ctl), "start"] + ["-D", str(datadir)]
+        cmd = [str(self.pg_ctl), "start", "-D", str(datadir)]
         cmd.extend(_wait_args_to_opts(wait))
         if logfile:
             cmd.append(f"--log={logfile}")
-        options = _args_to_opts(opts)
-        if options:
-            cmd.extend(["-o", " ".join(options)])
+        if opts:
+            cmd.extend(["-o", " ".join(_args_to_opts(opts))])
         return cmd
 
     def stop_cmd(
@@ -195,7 +288,7 @@ class AbstractPGCtl(abc.ABC):
         mode: str | None = None,
         wait: bool | int = True,
     ) -> list[str]:
-        cmd = [str(self.pg_ctl), "stop"] + ["-D", str(datadir)]
+        cmd = [str(self.pg_ctl), "stop", "-D", str(datadir)]
         cmd.extend(_wait_args_to_opts(wait))
         if mode:
             cmd.append(f"--mode={mode}")
@@ -209,35 +302,72 @@ class AbstractPGCtl(abc.ABC):
         wait: bool | int = True,
         **opts: str | Literal[True],
     ) -> list[str]:
-        cmd = [str(self.pg_ctl), "restart"] + ["-D", str(datadir)]
+        cmd = [str(self.pg_ctl), "restart", "-D", str(datadir)]
         cmd.extend(_wait_args_to_opts(wait))
         if mode:
             cmd.append(f"--mode={mode}")
-        options = _args_to_opts(opts)
-        if options:
-            cmd.extend(["-o", " ".join(options)])
+        if opts:
+            cmd.extend(["-o", " ".join(_args_to_opts(opts))])
         return cmd
 
     def reload_cmd(self, datadir: Path | str) -> list[str]:
-        return [str(self.pg_ctl), "reload"] + ["-D", str(datadir)]
+        return [str(self.pg_ctl), "reload", "-D", str(datadir)]
 
     def status_cmd(self, datadir: Path | str) -> list[str]:
-        return [str(self.pg_ctl), "status"] + ["-D", str(datadir)]
+        return [str(self.pg_ctl), "status", "-D", str(datadir)]
 
-    def controldata_cmd(self, datadir: Path | str) -> list[str]:
-        pg_controldata = self.bindir / "pg_controldata"
-        if not pg_controldata.exists():
+    @cached_property
+    def pg_controldata(self) -> Path:
+        """Path to ``pg_controldata`` executable."""
+        value = self.bindir / "pg_controldata"
+        if not value.exists():
             raise OSError("pg_controldata executable not found")
-        return [str(pg_controldata)] + ["-D", str(datadir)]
-
-    def _parse_control_data(self, lines: list[str]) -> dict[str, str]:
-        """Parse pg_controldata command output."""
-        controldata = {}
-        for line in lines:
-            m = re.match(r"^([^:]+):(.*)$", line)
-            if m:
-                controldata[m.group(1).strip()] = m.group(2).strip()
-        return controldata
+        return value
+
+    def controldata_cmd(self, datadir: Path | str) -> list[str]:
+        return [str(self.pg_controldata), "-D", str(datadir)]
+
+    @cached_property
+    def _controldata_cache(
+        self,
+    ) -> dict[str, tuple[tuple[int, ...], dict[str, str]]]:
+        # Parsed controldata, along with the stat() stamp of the pg_control
+        # file it was read from, by data directory.
+        return {}
+
+    def _pg_control_stamp(self, datadir: Path | str) -> tuple[int, ...] | None:
+        # The change time also notices a rewrite whose modification time was
+        # restored afterwards, since utime() cannot set it back. Size and
+        # inode only change when the file is replaced, e.g. from a backup:
+        # PostgreSQL rewrites pg_control in place, at a fixed size. Rewrites
+        # within the timestamp granularity of the filesystem go unnoticed.
+        try:
+            st = (Path(datadir) / "global" / "pg_control").stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino
+
+    def _cached_controldata(
+        self, datadir: Path | str, stamp: tuple[int, ...] | None
+    ) -> dict[str, str] | None:
+        if stamp is not None:
+            try:
+                cached_stamp, controldata = self._controldata_cache[str(datadir)]
+            except KeyError:
+                pass
+            else:
+                if cached_stamp == stamp:
+                    return dict(controldata)
+        return None
+
+    def _cache_controldata(
+        self,
+        datadir: Path | str,
+        stamp: tuple[int, ...] | None,
+        controldata: dict[str, str],
+    ) -> None:
+        if stamp is not None:
+            self._controldata_cache[str(datadir)] = stamp, dict(controldata)
 
 
 class PGCtl(AbstractPGCtl):
@@ -262,18 +392,25 @@ class PGCtl(AbstractPGCtl):
         run_command: CommandRunner = run_command,
     ) -> None:
         if bindir is None:
-            pg_config = shutil.which("pg_config")
-            if pg_config is None:
-                raise OSError("pg_config executable not found")
-            bindir = run_command(
-                [pg_config, "--bindir"], check=True, capture_output=True
-            ).stdout.strip()
+            pg_config = _pg_config()
+            key = _bindir_key(pg_config)
+            try:
+                bindir = _bindirs[key]
+            except KeyError:
+                bindir = run_command(
+                    [pg_config, "--bindir"], check=True, capture_output=True
+                ).stdout.strip()
+                _cache_store(_bindirs, key, bindir)
         self.bindir = Path(bindir)
         self.run_command = run_command
-        version = run_command(
-            self.version_cmd(), check=True, capture_output=True
-        ).stdout.strip()
-        self.version = num_version(version)
+        key = _version_key(self.pg_ctl)
+        try:
+            self.version = _versions[key]
+        except KeyError:
+            version = run_command(
+                self.version_cmd(), check=True, capture_output=True
+            ).stdout.strip()
+            self.version = _cache_store(_versions, key, num_version(version))
 
     def init(
         self, datadir: Path | str, **opts: str | Literal[True]
@@ -372,25 +509,34 @@ class PGCtl(AbstractPGCtl):
         :param datadir: Path to database storage area
         :return: Status value.
         """
-        cp = self.run_command(self.status_cmd(datadir))
-        rc = cp.returncode
-        if rc == 1:
-            raise subprocess.CalledProcessError(rc, cp.args, cp.stdout, cp.stderr)
-        return Status(rc)
+        return _status(self.run_command(self.status_cmd(datadir)))
 
-    def controldata(self, datadir: Path | str) -> dict[str, str]:
+    def controldata(
+        self, datadir: Path | str, *, use_cache: bool = True
+    ) -> dict[str, str]:
         """Run the pg_controldata command and parse the result to return
         controldata as dict.
 
         :param datadir: Path to database storage area
+        :param use_cache: Reuse the result of a previous call for the same
+            `datadir` if its ``global/pg_control`` file was not modified
+            since, according to its timestamps. On filesystems with coarse
+            timestamps, e.g. one second, a result may thus be stale if
+            ``pg_control`` was rewritten right after it was read; pass
+            ``False`` when an up-to-date result is required.
         """
-        r = self.run_command(
-            self.controldata_cmd(datadir),
-            check=True,
-            env={"LC_ALL": "C"},
-            capture_output=True,
-        ).stdout
-        return parse_control_data(r.splitlines())
+        stamp = self._pg_control_stamp(datadir) if use_cache else None
+        controldata = self._cached_controldata(datadir, stamp)
+        if controldata is None:
+            r = self.run_command(
+                self.controldata_cmd(datadir),
+                check=True,
+                env=_controldata_env(),
+                capture_output=True,
+            ).stdout
+            controldata = parse_control_data(r.splitlines())
+            self._cache_controldata(datadir, stamp, controldata)
+        return controldata
 
 
 class AsyncPGCtl(AbstractPGCtl):
@@ -424,20 +570,27 @@ class AsyncPGCtl(AbstractPGCtl):
             is not available.
         """
         if bindir is None:
-            pg_config = shutil.which("pg_config")
-            if pg_config is None:
-                raise OSError("pg_config executable not found")
-            bindir = (
-                await run_command(
-                    [pg_config, "--bindir"], check=True, capture_output=True
-                )
-            ).stdout.strip()
+            pg_config = _pg_config()
+            key = _bindir_key(pg_config)
+            try:
+                bindir = _bindirs[key]
+            except KeyError:
+                bindir = (
+                    await run_command(
+                        [pg_config, "--bindir"], check=True, capture_output=True
+                    )
+                ).stdout.strip()
+                _cache_store(_bindirs, key, bindir)
         bindir = Path(bindir)
         self = cls(bindir, run_command)
-        version = (
-            await run_command(self.version_cmd(), check=True, capture_output=True)
-        ).stdout.strip()
-        self.version = num_version(version)
+        key = _version_key(self.pg_ctl)
+        try:
+            self.version = _versions[key]
+        except KeyError:
+            version = (
+                await run_command(self.version_cmd(), check=True, capture_output=True)
+            ).stdout.strip()
+            self.version = _cache_store(_versions, key, num_version(version))
         return self
 
     async def init(
@@ -487,34 +640,90 @@ class AsyncPGCtl(AbstractPGCtl):
         return await self.run_command(self.reload_cmd(datadir), check=True)
 
     async def status(self, datadir: Path | str) -> Status:
-        cp = await self.run_command(self.status_cmd(datadir))
-        rc = cp.returncode
-        if rc == 1:
-            raise subprocess.CalledProcessError(rc, cp.args, cp.stdout, cp.stderr)
-        return Status(rc)
+        return _status(await self.run_command(self.status_cmd(datadir)))
 
-    async def controldata(self, datadir: Path | str) -> dict[str, str]:
-        r = (
-            await self.run_command(
-                self.controldata_cmd(datadir),
-                check=True,
-                env={"LC_ALL": "C"},
-                capture_output=True,
-            )
-        ).stdout
-        return parse_control_data(r.splitlines())
+    async def status_many(
+        self,
+        datadirs: Iterable[Path | str],
+        *,
+        max_concurrency: int | None = None,
+    ) -> list[Status]:
+        """Check the status of several PostgreSQL clusters concurrently.
+
+        :param datadirs: Paths to database storage areas
+        :param max_concurrency: Maximum number of ``pg_ctl status`` commands
+            running at once; defaults to four times the number of CPUs.
+        :return: Status values, in the same order as `datadirs`.
+
+        :raises: :class:`ValueError` if `max_concurrency` is not positive.
+        """
+        if max_concurrency is None:
+            max_concurrency = (os.cpu_count() or 1) * 4
+        elif max_concurrency < 1:
+            # A zero-valued semaphore would wait forever.
+            raise ValueError("max_concurrency must be a positive integer")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def status(datadir: Path | str) -> Status:
+            async with semaphore:
+                return await self.status(datadir)
+
+        return list(await asyncio.gather(*(status(d) for d in datadirs)))
+
+    async def controldata(
+        self, datadir: Path | str, *, use_cache: bool = True
+    ) -> dict[str, str]:
+        stamp = self._pg_control_stamp(datadir) if use_cache else None
+        controldata = self._cached_controldata(datadir, stamp)
+        if controldata is None:
+            r = (
+                await self.run_command(
+                    self.controldata_cmd(datadir),
+                    check=True,
+                    env=_controldata_env(),
+                    capture_output=True,
+                )
+            ).stdout
+            controldata = parse_control_data(r.splitlines())
+            self._cache_controldata(datadir, stamp, controldata)
+        return controldata
+
+
+# Variables kept from the environment when running pg_controldata, so that
+# it still finds its shared libraries.
+_controldata_passthrough_env = (
+    "PATH",
+    "LD_LIBRARY_PATH",
+    "LD_PRELOAD",
+    "DYLD_LIBRARY_PATH",
+)
+
+
+def _controldata_env() -> dict[str, str]:
+    """Return the environment to run pg_controldata in: C locale, for the
+    output to be parsable, and only variables from _controldata_passthrough_env.
+    """
+    env = {k: os.environ[k] for k in _controldata_passthrough_env if k in os.environ}
+    env["LC_ALL"] = "C"
+    return env
 
 
-def parse_control_data(lines: Sequence[str]) -> dict[str, str]:
+def parse_control_data(lines: Iterable[str]) -> dict[str, str]:
     """Parse pg_controldata command output."""
     controldata = {}
     for line in lines:
-        m = re.match(r"^([^:]+):(.*)$", line)
-        if m:
-            controldata[m.group(1).strip()] = m.group(2).strip()
+        key, sep, value = line.partition(":")
+        if sep and key:
+            controldata[key.strip()] = value.strip()
     return controldata
 
 
+_version_re = re.compile(r"pg_ctl \(\w+\) ([0-9]+)\.([0-9]+)(?:\.([0-9]+))?")
+_dev_version_re = re.compile(
+    r"pg_ctl \(\w+\) ([0-9]+)(?:\.([0-9]+))?(devel|beta[0-9]+|rc[0-9]+)"
+)
+
+
 def num_version(text_version: str) -> int:
     """Return PostgreSQL numeric version as defined by LibPQ PQserverVersion
 
@@ -533,10 +742,7 @@ def num_version(text_version: str) -> int:
     >>> num_version("pg_ctl (PostgreSQL) 9.6rc1")
     90600
     """
-    res = re.match(
-        r"pg_ctl \(\w+\) ([0-9]+)\.([0-9]+)(?:\.([0-9]+))?",
-        text_version,
-    )
+    res = _version_re.match(text_version)
     if res is not None:
         rmatch = res.group(1)
         if int(res.group(1)) < 10:
@@ -564,10 +770,7 @@ def num_dev_version(text_version: str) -> int:
     >>> num_dev_version("pg_ctl (PostgreSQL) 9.6devel")
     90600
     """
-    res = re.match(
-        r"pg_ctl \(\w+\) ([0-9]+)(?:\.([0-9]+))?(devel|beta[0-9]+|rc[0-9]+)",
-        text_version,
-    )
+    res = _dev_version_re.match(text_version)
     if not res:
         raise Exception(f"Undefined PostgreSQL version: {text_version}")
     rmatch = res.group(1)
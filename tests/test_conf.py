@@ -1,3 +1,5 @@
+import enum
+import math
 import pathlib
 from datetime import timedelta
 from io import StringIO
@@ -28,6 +30,13 @@ def test_parse_value():
     assert -2 == parse_value("-2")
     assert 0.2 == parse_value("0.2")
     assert 0 == parse_value("0")
+    assert 0.5 == parse_value(".5")
+    assert math.isnan(parse_value("nan"))
+    assert math.isnan(parse_value("-nan"))
+    assert math.inf == parse_value("inf")
+    assert math.inf == parse_value("+Infinity")
+    assert -math.inf == parse_value("-inf")
+    assert "notice" == parse_value("notice")
     # Numbers, quoted
     assert "0" == parse_value("'0'")
     assert "2.3" == parse_value("'2.3'")
@@ -108,6 +117,8 @@ def test_parser():
     bonjour 'without equals'
     # bonjour_name = ''		# defaults to the computer name
     shared.buffers = 248MB
+    log_line_prefix  = '%m '
+    work_mem  = 4MB  # aligned
     #authentication_timeout = 2min      # will be overwritten by the one below
     #authentication_timeout = 1min		# 1s-600s
     # port = 5454  # commented value does not override previous (uncommented) one
@@ -130,6 +141,9 @@ def test_parser():
     )
     assert "without equals" == conf.bonjour
     assert "248MB" == conf["shared.buffers"]
+    assert conf.log_line_prefix == "%m "
+    assert conf.work_mem == "4MB"
+    assert conf.entries["work_mem"].comment == "aligned"
 
     assert conf.entries["bonjour_name"].commented
     assert (
@@ -173,6 +187,34 @@ def test_configuration_fields():
     assert "path" not in cfg and "path" not in cfg.entries
 
 
+def test_private_state():
+    """Internal caches are not dataclass fields and weak references work."""
+    import copy
+    import dataclasses
+    import pickle
+    import weakref
+
+    from pgtoolkit.conf import Configuration, Entry, parse
+
+    cfg = parse(["port = 5432  # a comment\n"])
+    entry = cfg.entries["port"]
+    assert [f.name for f in dataclasses.fields(Configuration)] == [
+        "path",
+        "lines",
+        "entries",
+    ]
+    assert "_line" not in [f.name for f in dataclasses.fields(Entry)]
+    assert "_lineno" not in dataclasses.asdict(cfg)
+    assert weakref.ref(cfg)() is cfg
+    assert weakref.ref(entry)() is entry
+
+    for other in (copy.copy(entry), pickle.loads(pickle.dumps(entry))):
+        assert other == entry
+        assert str(other) == "port = 5432  # a comment"
+        other.value = 5433
+        assert str(other) == "port = 5433  # a comment"
+
+
 def test_configuration_multiple_entries():
     from pgtoolkit.conf import Configuration
 
@@ -205,6 +247,19 @@ def test_parser_includes_require_an_absolute_file_path():
         parse(lines)
 
 
+def test_parser_file_line_separators(tmp_path: pathlib.Path):
+    from pgtoolkit.conf import parse
+
+    # Only '\n' ends a line in files, not other str.splitlines() separators.
+    path = tmp_path / "postgresql.conf"
+    path.write_text(
+        "# section\x0cfoo bar\ncluster_name = 'a\x85b'\n", encoding="utf-8", newline=""
+    )
+    conf = parse(path)
+    assert conf.as_dict() == {"cluster_name": "a\x85b"}
+    assert len(conf.lines) == 2
+
+
 def test_parser_includes_string_with_absolute_file_path(tmp_path: pathlib.Path):
     from pgtoolkit.conf import parse
 
@@ -277,6 +332,27 @@ def test_parser_includes():
     ]
 
 
+def test_parser_include_dir(tmp_path):
+    from pgtoolkit.conf import parse
+
+    confd = tmp_path / "conf.d"
+    confd.mkdir()
+    (confd / "b.conf").write_text("port = 5433\n")
+    (confd / "a.conf").write_text("port = 5432\nwork_mem = 4MB\n")
+    (confd / ".hidden.conf").write_text("port = 5434\n")
+    (confd / "notconf").write_text("port = 5435\n")
+    (confd / "dir.conf").mkdir()
+    pgconf = tmp_path / "postgres.conf"
+    pgconf.write_text("include_dir = 'conf.d'\n")
+
+    conf = parse(pgconf)
+    assert conf.as_dict() == {"port": 5433, "work_mem": "4MB"}
+
+    (confd / "c.conf").symlink_to(tmp_path / "missing.conf")
+    with pytest.raises(FileNotFoundError, match="c.conf"):
+        parse(pgconf)
+
+
 def test_parser_includes_loop(tmp_path):
     from pgtoolkit.conf import parse
 
@@ -287,6 +363,12 @@ def test_parser_includes_loop(tmp_path):
     with pytest.raises(RuntimeError, match="loop detected"):
         parse(str(pgconf))
 
+    with pgconf.open("w") as f:
+        f.write(f"include = '../{tmp_path.name}/postgres.conf'\n")
+
+    with pytest.raises(RuntimeError, match="loop detected"):
+        parse(str(pgconf))
+
 
 def test_parser_includes_notfound(tmp_path):
     from pgtoolkit.conf import parse
@@ -325,6 +407,21 @@ def test_entry_edit():
     assert entry.value == 1234
     entry.value = "9876"
     assert entry.value == 9876
+    assert str(entry) == "port = 9876"
+    entry.comment = "the port"
+    assert str(entry) == "port = 9876  # the port"
+    entry.commented = True
+    assert str(entry) == "#port = 9876  # the port"
+
+    entry = Entry("fsync", 1)
+    assert str(entry) == "fsync = 1"
+    entry.value = True
+    assert str(entry) == "fsync = on"
+
+    entry = Entry("seq_page_cost", 0.0)
+    assert str(entry) == "seq_page_cost = 0.0"
+    entry.value = -0.0
+    assert str(entry) == "seq_page_cost = -0.0"
 
 
 def test_entry_constructor_parse_value():
@@ -520,3 +617,63 @@ def test_configuration_iter():
     conf.port = 5432
     conf.log_timezone = "Europe/Paris"
     assert [e.name for e in conf] == ["port", "log_timezone"]
+
+
+def test_configuration_str_subclass_key():
+    from pgtoolkit.conf import Configuration
+
+    class Param(str, enum.Enum):
+        port = "port"
+
+    conf = Configuration()
+    conf[Param.port] = 5432
+    assert conf["port"] == 5432
+
+
+def test_configuration_duplicated_lines():
+    from pgtoolkit.conf import Configuration
+
+    conf = Configuration()
+    list(conf.parse(["port = 5432\n", "port = 5432\n", "work_mem = 4MB\n"]))
+    conf["port"] = 5433
+    with conf.edit() as entries:
+        entries["work_mem"].value = "8MB"
+    assert conf.lines == ["port = 5432\n", "port = 5433\n", "work_mem = '8MB'\n"]
+    with conf.edit() as entries:
+        del entries["port"]
+    assert conf.lines == ["port = 5432\n", "work_mem = '8MB'\n"]
+    conf["work_mem"] = "16MB"
+    assert conf.lines == ["port = 5432\n", "work_mem = '16MB'\n"]
+
+
+def test_edit_remove_entries():
+    from pgtoolkit.conf import Configuration
+
+    conf = Configuration()
+    list(conf.parse(["a = 1\n", "# comment\n", "b = 2\n", "c = 3\n", "d = 4\n"]))
+    with conf.edit() as entries:
+        del entries["a"]
+        del entries["c"]
+    assert conf.lines == ["# comment\n", "b = 2\n", "d = 4\n"]
+    conf["d"] = 5
+    conf["b"] = 3
+    assert conf.lines == ["# comment\n", "b = 3\n", "d = 5\n"]
+
+
+def test_edit_entry_subclass():
+    from pgtoolkit.conf import Configuration, Entry
+
+    class MyEntry(Entry):
+        pass
+
+    conf = Configuration()
+    list(conf.parse(["port=5432  # a comment\n", "work_mem = 4MB\n"]))
+    conf.entries["port"] = MyEntry(
+        "port", 5432, comment="a comment", raw_line="port=5432  # a comment\n"
+    )
+    with conf.edit() as entries:
+        assert type(entries["port"]) is MyEntry
+        entries["work_mem"].value = "8MB"
+    assert type(conf.entries["port"]) is MyEntry
+    # The unchanged entry keeps its original line.
+    assert conf.lines == ["port=5432  # a comment\n", "work_mem = '8MB'\n"]
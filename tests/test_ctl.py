@@ -1,5 +1,10 @@
+import asyncio
+import os
 import shlex
+import shutil
 import subprocess
+import sys
+import time
 from collections.abc import Sequence
 from pathlib import Path
 from typing import Any
@@ -11,6 +16,22 @@ import pytest_asyncio
 from pgtoolkit import ctl  # noqa: E402
 
 
+@pytest.mark.parametrize(
+    "run_command", [ctl.asyncio_run_command, ctl.asyncio_run_command_threaded]
+)
+@pytest.mark.asyncio
+async def test_asyncio_run_command(run_command: ctl.AsyncCommandRunner) -> None:
+    args = [sys.executable, "-c", "print('hello')"]
+    r = await run_command(args, capture_output=True, check=True)
+    assert r.returncode == 0
+    assert r.stdout == "hello\n"
+    r = await run_command([sys.executable, "-c", "exit(3)"])
+    assert r.returncode == 3
+    assert r.stdout is None
+    with pytest.raises(subprocess.CalledProcessError):
+        await run_command([sys.executable, "-c", "exit(1)"], check=True)
+
+
 def test__args_to_opts():
     opts = ctl._args_to_opts(
         {
@@ -70,6 +91,31 @@ def test_version(pgctl: ctl.AsyncPGCtl) -> None:
     assert pgctl.version == 110010
 
 
+def test_version_cache(bindir: Path) -> None:
+    def run_command(args: Sequence[str], **kwargs: Any) -> ctl.CompletedProcess:
+        calls.append(args)
+        return run_command_version_only(args, **kwargs)
+
+    calls: list[Sequence[str]] = []
+    assert ctl.PGCtl(bindir, run_command=run_command).version == 110010
+    assert ctl.PGCtl(bindir, run_command=run_command).version == 110010
+    assert len(calls) == 1
+    pg_ctl = bindir / "pg_ctl"
+    st = pg_ctl.stat()
+    os.utime(pg_ctl, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert ctl.PGCtl(bindir, run_command=run_command).version == 110010
+    assert len(calls) == 2
+
+
+def test_cache_store() -> None:
+    cache: dict[int, int] = {}
+    with patch.object(ctl, "_CACHE_SIZE", 2):
+        assert ctl._cache_store(cache, 1, 10) == 10
+        ctl._cache_store(cache, 2, 20)
+        ctl._cache_store(cache, 3, 30)
+    assert cache == {2: 20, 3: 30}
+
+
 def test_init_cmd(pgctl: ctl.PGCtl) -> None:
     assert pgctl.init_cmd(
         "data",
@@ -160,6 +206,66 @@ def test_status_returncode1(pgctl: ctl.PGCtl) -> None:
     run_command.assert_called_once_with(["pg_ctl", "status", "-D", "data"])
 
 
+def test__controldata_env() -> None:
+    with patch.dict(
+        "os.environ", {"LD_LIBRARY_PATH": "/opt/pg/lib", "PGDATA": "data"}, clear=True
+    ):
+        assert ctl._controldata_env() == {
+            "LD_LIBRARY_PATH": "/opt/pg/lib",
+            "LC_ALL": "C",
+        }
+
+
+def test_controldata_cache(pgctl: ctl.PGCtl, tmp_path: Path) -> None:
+    pgctl.pg_controldata = Path("pg_controldata")
+    (tmp_path / "global").mkdir()
+    pg_control = tmp_path / "global" / "pg_control"
+    pg_control.write_bytes(bytes(8192))
+    cp = subprocess.CompletedProcess([], 0, stdout="Database block size: 8192\n")
+    with patch.object(pgctl, "run_command", return_value=cp) as run_command:
+        assert pgctl.controldata(tmp_path) == {"Database block size": "8192"}
+        assert pgctl.controldata(tmp_path) == {"Database block size": "8192"}
+        assert run_command.call_count == 1
+        pgctl.controldata(tmp_path, use_cache=False)
+        assert run_command.call_count == 2
+        st = pg_control.stat()
+        os.utime(pg_control, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        pgctl.controldata(tmp_path)
+        assert run_command.call_count == 3
+        # An in-place rewrite at the same size, as PostgreSQL does, is
+        # noticed even if the modification time is restored afterwards.
+        st = pg_control.stat()
+        # Let the change time move past the coarse clock tick of the kernel.
+        time.sleep(0.05)
+        with pg_control.open("r+b") as f:
+            f.write(b"\1" * st.st_size)
+        os.utime(pg_control, ns=(st.st_atime_ns, st.st_mtime_ns))
+        new_st = pg_control.stat()
+        assert (new_st.st_mtime_ns, new_st.st_size, new_st.st_ino) == (
+            st.st_mtime_ns,
+            st.st_size,
+            st.st_ino,
+        )
+        pgctl.controldata(tmp_path)
+        assert run_command.call_count == 4
+    run_command.assert_called_with(
+        ["pg_controldata", "-D", str(tmp_path)],
+        check=True,
+        env=ctl._controldata_env(),
+        capture_output=True,
+    )
+
+
+def test_status_unexpected_returncode(pgctl: ctl.PGCtl) -> None:
+    with (
+        patch.object(
+            pgctl, "run_command", return_value=subprocess.CompletedProcess([], 5)
+        ),
+        pytest.raises(ValueError, match="5 is not a valid Status"),
+    ):
+        pgctl.status("data")
+
+
 @pytest_asyncio.fixture
 async def apgctl(bindir: Path) -> ctl.AsyncPGCtl:
     async def run_command(args: Sequence[str], **kwargs: Any) -> ctl.CompletedProcess:
@@ -207,6 +313,41 @@ async def test_status_returncode1_async(apgctl: ctl.AsyncPGCtl) -> None:
     run_command.assert_called_once_with(["pg_ctl", "status", "-D", "data"])
 
 
+@pytest.mark.asyncio
+async def test_status_many_async(apgctl: ctl.AsyncPGCtl) -> None:
+    async def run_command(args: Sequence[str], **kwargs: Any) -> ctl.CompletedProcess:
+        return subprocess.CompletedProcess(args, {"a": 0, "b": 3}[args[-1]])
+
+    with patch.object(apgctl, "run_command", side_effect=run_command):
+        actual = await apgctl.status_many(["b", "a", "b"])
+    assert actual == [
+        ctl.Status.not_running,
+        ctl.Status.running,
+        ctl.Status.not_running,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_status_many_async_max_concurrency(apgctl: ctl.AsyncPGCtl) -> None:
+    running = max_running = 0
+
+    async def run_command(args: Sequence[str], **kwargs: Any) -> ctl.CompletedProcess:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(running, max_running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return subprocess.CompletedProcess(args, 0)
+
+    with patch.object(apgctl, "run_command", side_effect=run_command):
+        actual = await apgctl.status_many(map(str, range(10)), max_concurrency=3)
+    assert actual == [ctl.Status.running] * 10
+    assert max_running == 3
+
+    with pytest.raises(ValueError, match="max_concurrency"):
+        await apgctl.status_many(["a"], max_concurrency=0)
+
+
 def test_parse_controldata() -> None:
     lines = [
         "pg_control version number:            1100",
@@ -215,6 +356,8 @@ def test_parse_controldata() -> None:
         "Database cluster state:               shut down",
         "pg_control last modified:             Tue 07 Jul 2020 01:08:58 PM CEST",
         "WAL block size:                       8192",
+        "",
+        "no separator",
     ]
     controldata = ctl.parse_control_data(lines)
     assert controldata == {
@@ -225,3 +368,34 @@ def test_parse_controldata() -> None:
         "pg_control last modified": "Tue 07 Jul 2020 01:08:58 PM CEST",
         "pg_control version number": "1100",
     }
+
+
+def test_bindir_from_pg_config(bindir: Path, tmp_path_factory) -> None:
+    pg_config_dir = tmp_path_factory.mktemp("pg_config")
+    pg_config = pg_config_dir / "pg_config"
+    pg_config.touch(mode=0o777)
+
+    def run_command(args: Sequence[str], **kwargs: Any) -> ctl.CompletedProcess:
+        if list(args) == [str(pg_config), "--bindir"]:
+            calls.append(args)
+            return subprocess.CompletedProcess(args, 0, stdout=f"{bindir}\n")
+        return run_command_version_only(args, **kwargs)
+
+    calls: list[Sequence[str]] = []
+    with (
+        patch.dict("os.environ", {"PATH": str(pg_config_dir)}),
+        patch("shutil.which", wraps=shutil.which) as which,
+    ):
+        assert ctl.PGCtl(run_command=run_command).bindir == bindir
+        assert ctl.PGCtl(run_command=run_command).bindir == bindir
+        assert which.call_count == 1
+        assert len(calls) == 1
+        # An upgraded pg_config is run again.
+        st = pg_config.stat()
+        os.utime(pg_config, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        assert ctl.PGCtl(run_command=run_command).bindir == bindir
+        assert len(calls) == 2
+        pg_config.unlink()
+        with pytest.raises(OSError, match="pg_config executable not found"):
+            ctl.PGCtl(run_command=run_command)
+    assert len(calls) == 2
@@ -39,13 +39,16 @@ def test_open_or_return(tmp_path):
 
 
 def test_timer():
+    import time
+    from datetime import timedelta
+
     from pgtoolkit._helpers import Timer
 
     with Timer() as timer:
-        pass
+        time.sleep(0.01)
 
     assert timer.start
-    assert timer.delta
+    assert timer.delta >= timedelta(milliseconds=10)
 
 
 def test_format_timedelta():
@@ -76,3 +79,13 @@ def test_json_encoder():
     assert '"2012-12-21T00:00:00' in payload
     assert '"40s"' in payload
     assert ": 42" in payload
+
+
+def test_jsonable():
+    from datetime import datetime, timedelta
+
+    from pgtoolkit._helpers import jsonable
+
+    assert jsonable(datetime(2012, 12, 21)) == "2012-12-21T00:00:00"
+    assert jsonable(timedelta(seconds=40)) == "40s"
+    assert jsonable(42) == 42